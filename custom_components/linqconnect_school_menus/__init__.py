@@ -1,18 +1,72 @@
 """LinQ Connect School Menus integration for Home Assistant."""
 from __future__ import annotations
 
+import aiohttp
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, Platform
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
 
-from .const import DOMAIN
+from .api import LinQConnectClient
+from .const import (
+    CONF_DISTRICT_ID,
+    CONF_MENU_URL,
+    DATA_SESSION,
+    DATA_SESSION_UNSUB,
+    DOMAIN,
+)
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
 
+@callback
+def _async_get_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """Return the shared LinQ Connect session, creating it if needed."""
+    session = hass.data[DOMAIN].get(DATA_SESSION)
+    if session is None or session.closed:
+        # Drop the shutdown listener of a previous session before replacing it
+        if unsub := hass.data[DOMAIN].pop(DATA_SESSION_UNSUB, None):
+            unsub()
+
+        # Keep connections to api.linqconnect.com alive and cache DNS so
+        # bursts of picture requests reuse TCP/TLS connections
+        connector = aiohttp.TCPConnector(
+            limit=8,
+            limit_per_host=8,
+            keepalive_timeout=75,
+            ttl_dns_cache=300,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        hass.data[DOMAIN][DATA_SESSION] = session
+
+        async def _async_close_session(event: Event) -> None:
+            """Close the session when Home Assistant shuts down."""
+            hass.data[DOMAIN].pop(DATA_SESSION_UNSUB, None)
+            await session.close()
+
+        # Config entries are not unloaded on shutdown, so close it here too
+        hass.data[DOMAIN][DATA_SESSION_UNSUB] = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, _async_close_session
+        )
+    return session
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up LinQ Connect School Menus from a config entry."""
     hass.data.setdefault(DOMAIN, {})
+    session = _async_get_session(hass)
+
+    # Entries created before the district ID was stored resolve it once here
+    if not entry.data.get(CONF_DISTRICT_ID):
+        client = LinQConnectClient(session)
+        district_id = await client.resolve_district_id(entry.data[CONF_MENU_URL])
+        if not district_id:
+            raise ConfigEntryNotReady("Cannot fetch district information for menu URL")
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_DISTRICT_ID: district_id}
+        )
+
     hass.data[DOMAIN][entry.entry_id] = entry.data
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
@@ -24,4 +78,11 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
 
+        # Close the shared session once the last entry is unloaded
+        if set(hass.data[DOMAIN]) <= {DATA_SESSION, DATA_SESSION_UNSUB}:
+            if unsub := hass.data[DOMAIN].pop(DATA_SESSION_UNSUB, None):
+                unsub()
+            if session := hass.data[DOMAIN].pop(DATA_SESSION, None):
+                await session.close()
+
     return unload_ok
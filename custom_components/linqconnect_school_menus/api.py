@@ -3,17 +3,43 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import contextlib
 import hashlib
 import logging
 import os
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
+from operator import itemgetter
 from typing import Any
 import re
 
 import aiohttp
+import orjson
 
 _LOGGER = logging.getLogger(__name__)
 
+# Menu identifier URL pattern: /public/menu/IDENTIFIER
+_MENU_ID_RE = re.compile(r'/public/menu/([A-Z0-9]+)')
+
+# Category names treated as main entrees (lowercase)
+_ENTREE_CATEGORIES: frozenset[str] = frozenset(
+    {"main entree", "main entrée", "entree", "entrée"}
+)
+
+# Sort key for menu items
+_by_name = itemgetter("name")
+
+# Recipe picture cache limits
+_PICTURE_MISS_CACHE_SIZE = 64
+_PICTURE_MISS_TTL = 3 * 60 * 60  # seconds before retrying items without a picture
+
+# Maximum concurrent picture requests across all days, to avoid API rate limits
+_MAX_PICTURE_REQUESTS = 4
+
+# Abandon stuck picture requests quickly so one slow item doesn't hold up an update
+_PICTURE_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5)
+
 
 class LinQConnectClient:
     """Client for LinQ Connect school menu API."""
@@ -22,24 +48,34 @@ class LinQConnectClient:
         """Initialize the client."""
         self.session = session
         self.hass = hass
+        self._media_dir = (
+            os.path.join(hass.config.config_dir, "www", "school_menus") if hass else None
+        )
+        self._saved_pictures: set[str] = set()  # Filenames present in the media folder
+        self._date_cache: dict[str, tuple[datetime, str]] = {}  # Raw date -> (date, display)
+        # (district_id, item_id) -> expiry for items without a picture; saved
+        # pictures are found through _saved_pictures instead
+        self._picture_misses: dict[tuple[str, str], float] = {}
+        self._picture_sem = asyncio.Semaphore(_MAX_PICTURE_REQUESTS)
+        # (district_id, item_id, filename) -> picture fetch shared by all days in one update
+        self._picture_tasks: dict[tuple[str, str, str], asyncio.Task] = {}
+
+    async def resolve_district_id(self, menu_url: str) -> str | None:
+        """Resolve the district ID for a LinQ Connect menu URL."""
+        menu_identifier = self._extract_menu_identifier(menu_url)
+        if not menu_identifier:
+            return None
+
+        district_id = await self._get_district_id(menu_identifier)
+        if not district_id:
+            _LOGGER.error("Could not get district ID for identifier: %s", menu_identifier)
+        return district_id
 
     async def get_menu_data(
-        self, menu_url: str, building_id: str, days: int = 1
+        self, building_id: str, district_id: str, days: int = 1
     ) -> dict[str, Any]:
         """Fetch menu data from LinQ Connect API."""
         try:
-            # Extract menu identifier from URL
-            menu_identifier = self._extract_menu_identifier(menu_url)
-            if not menu_identifier:
-                _LOGGER.error("Could not extract menu identifier from URL")
-                return {}
-
-            # Get district ID using the identifier
-            district_id = await self._get_district_id(menu_identifier)
-            if not district_id:
-                _LOGGER.error("Could not get district ID for identifier: %s", menu_identifier)
-                return {}
-
             # Calculate date range
             start_date = datetime.now()
             end_date = start_date + timedelta(days=days)
@@ -60,7 +96,7 @@ class LinQConnectClient:
                     _LOGGER.error("HTTP error %s when fetching menu", response.status)
                     return {}
 
-                json_data = await response.json()
+                json_data = await response.json(loads=orjson.loads)
                 return await self._parse_menu_json(json_data, days, district_id)
 
         except asyncio.TimeoutError:
@@ -76,9 +112,7 @@ class LinQConnectClient:
     def _extract_menu_identifier(self, menu_url: str) -> str | None:
         """Extract menu identifier from the LinQ Connect URL."""
         try:
-            # Extract from URL pattern: /public/menu/IDENTIFIER
-            pattern = r'/public/menu/([A-Z0-9]+)'
-            match = re.search(pattern, menu_url)
+            match = _MENU_ID_RE.search(menu_url)
             if match:
                 return match.group(1)
 
@@ -100,7 +134,7 @@ class LinQConnectClient:
                     _LOGGER.error("HTTP error %s when fetching district ID", response.status)
                     return None
 
-                json_data = await response.json()
+                json_data = await response.json(loads=orjson.loads)
                 district_id = json_data.get("DistrictId")
 
                 if district_id:
@@ -129,7 +163,18 @@ class LinQConnectClient:
                 _LOGGER.warning("No menu sessions found in API response")
                 return menu_data
 
+            if self.hass:
+                # Prepare the media folder once per update, off the event loop
+                try:
+                    self._saved_pictures = await self.hass.async_add_executor_job(
+                        self._prepare_media_dir
+                    )
+                except OSError as err:
+                    _LOGGER.warning("Error preparing media folder: %s", err)
+                    self._saved_pictures = set()
+
             # Process each serving session (Breakfast, Lunch, etc.)
+            day_tasks = []
             for session in sessions:
                 session_name = session.get("ServingSession", "Unknown")
                 menu_plans = session.get("MenuPlans", [])
@@ -140,20 +185,40 @@ class LinQConnectClient:
 
                     # Limit to requested number of days
                     for day_data in days_data[:days]:
-                        day_menu = await self._parse_day_menu(day_data, session_name, plan_name, district_id)
-                        if day_menu:
-                            menu_data["menus"].append(day_menu)
+                        day_tasks.append(self._parse_day_menu(day_data, session_name, plan_name, district_id))
+
+            # Parse all days concurrently so picture fetches overlap across days
+            self._picture_tasks = {}
+            day_results = await asyncio.gather(*day_tasks, return_exceptions=True)
+            self._picture_tasks = {}
+            for day_menu in day_results:
+                if isinstance(day_menu, BaseException):
+                    _LOGGER.error("Error parsing day menu: %s", day_menu)
+                elif day_menu:
+                    menu_data["menus"].append(day_menu)
 
             # Sort menus by date
             menu_data["menus"].sort(key=lambda x: x.get("date_obj", datetime.min))
 
         except Exception as err:
+            # Return nothing so the coordinator keeps the last good menu
             _LOGGER.error("Error parsing menu JSON: %s", err)
+            return {}
 
         return menu_data
 
-    async def _get_recipe_picture(self, district_id: str, item_id: str) -> str | None:
-        """Get base64 picture data for a recipe item."""
+    async def _get_recipe_picture(self, district_id: str, item_id: str, filename: str) -> str | None:
+        """Fetch a recipe picture, save it to the media folder as filename and return its URL."""
+        if self.hass is None:
+            return None
+
+        cache_key = (district_id, item_id)
+        expiry = self._picture_misses.pop(cache_key, None)
+        if expiry is not None and expiry > time.monotonic():
+            # Re-insert to mark as most recently used
+            self._picture_misses[cache_key] = expiry
+            return None
+
         try:
             api_url = (
                 f"https://api.linqconnect.com/api/FamilyMenuRecipe"
@@ -163,59 +228,91 @@ class LinQConnectClient:
 
             _LOGGER.debug("Fetching recipe picture from: %s", api_url)
 
-            async with self.session.get(api_url) as response:
+            async with self._picture_sem, self.session.get(
+                api_url, timeout=_PICTURE_TIMEOUT
+            ) as response:
                 if response.status != 200:
                     _LOGGER.debug("HTTP error %s when fetching recipe picture for item %s", response.status, item_id)
                     return None
 
-                json_data = await response.json()
-                picture_data = json_data.get("Picture")
+                picture_data = (await response.json(loads=orjson.loads)).get("Picture")
 
-                if picture_data and len(picture_data.strip()) > 0:
-                    _LOGGER.debug("Found picture data for item %s (length: %d)", item_id, len(picture_data))
-                    return picture_data
-                else:
-                    _LOGGER.debug("No picture data found for item %s", item_id)
-                    return None
+            if not picture_data or not picture_data.strip():
+                _LOGGER.debug("No picture data found for item %s", item_id)
+                self._cache_picture_miss(cache_key)
+                return None
+
+            _LOGGER.debug("Found picture data for item %s (length: %d)", item_id, len(picture_data))
 
         except Exception as err:
             _LOGGER.debug("Error fetching recipe picture for item %s: %s", item_id, err)
             return None
 
-    async def _save_picture_to_media(self, item_name: str, item_id: str, picture_data: str) -> str | None:
-        """Save picture data to Home Assistant media folder and return URL."""
-        if not self.hass or not picture_data:
-            return None
-
         try:
-            # Create media directory if it doesn't exist
-            media_dir = os.path.join(self.hass.config.config_dir, "www", "school_menus")
-            os.makedirs(media_dir, exist_ok=True)
-
-            # Create a safe filename using item ID and name hash
-            name_hash = hashlib.md5(item_name.encode()).hexdigest()[:8]
-            filename = f"{item_id}_{name_hash}.png"
-            file_path = os.path.join(media_dir, filename)
-
-            # Decode base64 and save as PNG file
-            try:
-                image_data = base64.b64decode(picture_data)
-                with open(file_path, "wb") as f:
-                    f.write(image_data)
-
-                # Return the URL path for Home Assistant media
-                media_url = f"/local/school_menus/{filename}"
-                _LOGGER.debug("Saved picture for %s to %s", item_name, media_url)
-                return media_url
-
-            except Exception as save_err:
-                _LOGGER.warning("Failed to save picture file for %s: %s", item_name, save_err)
-                return None
-
+            # Decode base64 and save as PNG file in a single executor job
+            await self.hass.async_add_executor_job(
+                self._decode_and_write, filename, picture_data
+            )
         except Exception as err:
-            _LOGGER.warning("Error saving picture to media folder for %s: %s", item_name, err)
+            _LOGGER.warning("Failed to save picture file for item %s: %s", item_id, err)
             return None
 
+        self._saved_pictures.add(filename)
+
+        # Return the URL path for Home Assistant media
+        media_url = f"/local/school_menus/{filename}"
+        _LOGGER.debug("Saved picture for item %s to %s", item_id, media_url)
+        return media_url
+
+    def _shared_picture_task(
+        self, district_id: str, item_id: str, filename: str
+    ) -> asyncio.Task:
+        """Return the in-flight picture fetch for an item, starting it if needed."""
+        # Include the filename so an item ID listed under two names saves both files
+        cache_key = (district_id, item_id, filename)
+        task = self._picture_tasks.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._get_recipe_picture(district_id, item_id, filename)
+            )
+            self._picture_tasks[cache_key] = task
+        return task
+
+    def _cache_picture_miss(self, cache_key: tuple[str, str]) -> None:
+        """Remember an item without a picture, evicting the least recently used entry."""
+        self._picture_misses[cache_key] = time.monotonic() + _PICTURE_MISS_TTL
+        if len(self._picture_misses) > _PICTURE_MISS_CACHE_SIZE:
+            del self._picture_misses[next(iter(self._picture_misses))]
+
+    @staticmethod
+    def _picture_filename(item_name: str, item_id: str) -> str:
+        """Return a safe filename using item ID and name hash."""
+        name_hash = hashlib.md5(item_name.encode()).hexdigest()[:8]
+        return f"{item_id}_{name_hash}.png"
+
+    def _prepare_media_dir(self) -> set[str]:
+        """Create the media directory if needed and return the saved filenames."""
+        os.makedirs(self._media_dir, exist_ok=True)
+        # Leftover temp files from interrupted writes are never reused
+        return {name for name in os.listdir(self._media_dir) if not name.endswith(".tmp")}
+
+    def _decode_and_write(self, filename: str, picture_data: str) -> None:
+        """Decode base64 picture data and save it as a PNG file."""
+        image_data = base64.b64decode(picture_data)
+        file_path = os.path.join(self._media_dir, filename)
+        tmp_path = f"{file_path}.tmp"
+
+        # Write to a temp file and move it into place, so saved pictures are
+        # never truncated (they are reused on later updates)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(image_data)
+            os.replace(tmp_path, file_path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
     async def _parse_day_menu(self, day_data: dict, session_name: str, plan_name: str, district_id: str) -> dict[str, Any] | None:
         """Parse a single day's menu from JSON data."""
         try:
@@ -223,18 +320,22 @@ class LinQConnectClient:
             if not date_str:
                 return None
 
-            # Parse date
-            try:
-                date_obj = datetime.strptime(date_str, "%m/%d/%Y")
-                formatted_date = date_obj.strftime("%A, %B %d, %Y")
-            except ValueError:
-                date_obj = datetime.now()
-                formatted_date = date_str
-
-            menu_categories = {}
+            # Parse date, reusing results for dates seen in earlier updates
+            if date_str in self._date_cache:
+                date_obj, formatted_date = self._date_cache[date_str]
+            else:
+                try:
+                    date_obj = datetime.strptime(date_str, "%m/%d/%Y")
+                    formatted_date = date_obj.strftime("%A, %B %d, %Y")
+                    self._date_cache[date_str] = (date_obj, formatted_date)
+                except ValueError:
+                    date_obj = datetime.now()
+                    formatted_date = date_str
+
+            menu_categories: defaultdict[str, list] = defaultdict(list)
             total_items = []
-            all_items_with_categories = []  # Track all items with their categories for pictures
             main_entree_items = []  # Keep for backward compatibility
+            other_items = []  # Non-entree items, fetched for pictures after entrees
 
             # Process each meal in the day
             for meal in day_data.get("MenuMeals", []):
@@ -245,10 +346,7 @@ class LinQConnectClient:
                     category_name = category.get("CategoryName", "").strip()
                     if not category_name:
                         category_name = "Other"
-
-                    # Initialize category if not exists
-                    if category_name not in menu_categories:
-                        menu_categories[category_name] = []
+                    is_entree = category_name.lower() in _ENTREE_CATEGORIES
 
                     # Add category items
                     for recipe in category.get("Recipes", []):
@@ -266,52 +364,66 @@ class LinQConnectClient:
                             menu_categories[category_name].append(item_info)
                             total_items.append(f"{recipe_name} ({category_name})")
 
-                            # Collect all items for picture fetching
-                            all_items_with_categories.append(item_info)
-
-                            # Collect main entree items for backward compatibility
-                            if category_name.lower() in ["main entree", "main entrée", "entree", "entrée"]:
+                            # Collect items for picture fetching, split by entree
+                            if is_entree:
                                 main_entree_items.append(item_info)
+                            else:
+                                other_items.append(item_info)
 
             # Fetch pictures for items with priority for main entree items
             # Sort items to prioritize main entree, then limit to first 4 total
-            sorted_items = []
-            for item in all_items_with_categories:
-                if item["category"].lower() in ["main entree", "main entrée", "entree", "entrée"]:
-                    sorted_items.insert(0, item)  # Insert at beginning
-                else:
-                    sorted_items.append(item)  # Add at end
-
-            picture_fetch_tasks = []
-            for item in sorted_items[:4]:  # Limit to first 4 items total
-                if item["item_id"]:
-                    task = self._get_recipe_picture(district_id, item["item_id"])
-                    picture_fetch_tasks.append((item, task))
+            sorted_items = main_entree_items + other_items
+
+            # Pictures can only be saved with a Home Assistant instance (not during
+            # config flow validation), so skip fetching them entirely without one
+            if self.hass is not None:
+                picture_items = []
+                for item in sorted_items[:4]:  # Limit to first 4 items total
+                    if not item["item_id"]:
+                        continue
+
+                    # Reuse a picture already saved by a previous update
+                    filename = self._picture_filename(item["name"], item["item_id"])
+                    if filename in self._saved_pictures:
+                        item["picture_url"] = f"/local/school_menus/{filename}"
+                        continue
+
+                    picture_items.append((item, filename))
+
+                # Fetch and save all pictures concurrently, sharing fetches for
+                # items served on several days
+                picture_results = await asyncio.gather(
+                    *(
+                        self._shared_picture_task(district_id, item["item_id"], filename)
+                        for item, filename in picture_items
+                    ),
+                    return_exceptions=True,
+                )
+
+                for (item, _), media_url in zip(picture_items, picture_results):
+                    if isinstance(media_url, BaseException):
+                        _LOGGER.debug("Failed to fetch picture for %s: %s", item["name"], media_url)
+                    elif media_url:
+                        item["picture_url"] = media_url
+                        _LOGGER.debug("Added picture URL for item: %s -> %s", item["name"], media_url)
+
+            # Remove empty categories and sort items by name within each category
+            menu_categories = {
+                category: sorted(items, key=_by_name)
+                for category, items in menu_categories.items()
+                if items
+            }
 
-            # Execute picture fetching tasks and save to media folder
-            for item, task in picture_fetch_tasks:
-                try:
-                    picture_data = await task
-                    if picture_data:
-                        # Save picture to media folder and get URL
-                        media_url = await self._save_picture_to_media(
-                            item["name"], item["item_id"], picture_data
-                        )
-                        if media_url:
-                            item["picture_url"] = media_url
-                            _LOGGER.debug("Added picture URL for item: %s -> %s", item["name"], media_url)
-                        else:
-                            _LOGGER.debug("Failed to save picture for item: %s", item["name"])
-                except Exception as err:
-                    _LOGGER.debug("Failed to fetch picture for %s: %s", item["name"], err)
-
-            # Remove empty categories and sort items within each category
-            for category in list(menu_categories.keys()):
-                if not menu_categories[category]:
-                    del menu_categories[category]
-                else:
-                    # Sort by name for consistency
-                    menu_categories[category] = sorted(menu_categories[category], key=lambda x: x["name"])
+            # Flattened views used by the sensor attributes
+            menu_items_flat = [
+                {"category_name": category, "item_name": item["name"]}
+                for category, items in menu_categories.items()
+                for item in items
+            ]
+            simple_categories = {
+                category: [item["name"] for item in items]
+                for category, items in menu_categories.items()
+            }
 
             return {
                 "date": formatted_date,
@@ -320,6 +432,8 @@ class LinQConnectClient:
                 "plan": plan_name,
                 "items": total_items,  # Keep for backward compatibility
                 "categories": menu_categories,
+                "menu_items_flat": menu_items_flat,
+                "simple_categories": simple_categories,
                 "item_count": len(total_items),
                 "category_count": len(menu_categories),
                 "raw_date": date_str,
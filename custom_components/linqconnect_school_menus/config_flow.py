@@ -15,6 +15,7 @@ from homeassistant.exceptions import HomeAssistantError
 from .const import (
     CONF_BUILDING_ID,
     CONF_DAYS_TO_SHOW,
+    CONF_DISTRICT_ID,
     CONF_MENU_URL,
     DEFAULT_DAYS_TO_SHOW,
     DOMAIN,
@@ -82,7 +83,7 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
             raise CannotConnect(f"Cannot fetch district information for menu ID: {menu_id}")
 
         # Test menu data fetch
-        menu_data = await client.get_menu_data(data[CONF_MENU_URL], building_id, 1)
+        menu_data = await client.get_menu_data(building_id, district_id, 1)
         if not menu_data or not menu_data.get("menus"):
             raise CannotConnect("Cannot fetch menu data from API")
 
@@ -97,6 +98,7 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
         "title": f"School Menu ({menu_id})",
         CONF_MENU_URL: data[CONF_MENU_URL],
         CONF_BUILDING_ID: building_id,
+        CONF_DISTRICT_ID: district_id,
         CONF_DAYS_TO_SHOW: data[CONF_DAYS_TO_SHOW],
         "menu_id": menu_id,
     }
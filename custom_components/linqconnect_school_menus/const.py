@@ -12,6 +12,10 @@ DEFAULT_DAYS_TO_SHOW = 1
 MIN_DAYS_TO_SHOW = 1
 MAX_DAYS_TO_SHOW = 7
 
+# hass.data keys for the shared HTTP session and its shutdown listener
+DATA_SESSION = "session"
+DATA_SESSION_UNSUB = "session_unsub"
+
 # Update interval (in minutes)
 UPDATE_INTERVAL = 60
 
@@ -8,7 +8,6 @@ from typing import Any
 from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
@@ -20,7 +19,9 @@ from .api import LinQConnectClient
 from .const import (
     CONF_BUILDING_ID,
     CONF_DAYS_TO_SHOW,
+    CONF_DISTRICT_ID,
     CONF_MENU_URL,
+    DATA_SESSION,
     DOMAIN,
     UPDATE_INTERVAL,
 )
@@ -34,14 +35,14 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor platform."""
-    session = async_get_clientsession(hass)
+    session = hass.data[DOMAIN][DATA_SESSION]
     client = LinQConnectClient(session, hass)  # Pass hass instance for media storage
 
     coordinator = LinQConnectDataUpdateCoordinator(
         hass,
         client,
-        config_entry.data[CONF_MENU_URL],
         config_entry.data[CONF_BUILDING_ID],
+        hass.data[DOMAIN][config_entry.entry_id][CONF_DISTRICT_ID],
         config_entry.data[CONF_DAYS_TO_SHOW],
     )
 
@@ -57,14 +58,14 @@ class LinQConnectDataUpdateCoordinator(DataUpdateCoordinator):
         self,
         hass: HomeAssistant,
         client: LinQConnectClient,
-        menu_url: str,
         building_id: str,
+        district_id: str,
         days_to_show: int,
     ) -> None:
         """Initialize."""
         self.client = client
-        self.menu_url = menu_url
         self.building_id = building_id
+        self.district_id = district_id
         self.days_to_show = days_to_show
 
         super().__init__(
@@ -77,11 +78,22 @@ class LinQConnectDataUpdateCoordinator(DataUpdateCoordinator):
     async def _async_update_data(self) -> dict[str, Any]:
         """Update data via library."""
         try:
-            return await self.client.get_menu_data(
-                self.menu_url, self.building_id, self.days_to_show
+            data = await self.client.get_menu_data(
+                self.building_id, self.district_id, self.days_to_show
             )
         except Exception as exception:
-            raise UpdateFailed(exception) from exception
+            if self.data is None:
+                raise UpdateFailed(exception) from exception
+            _LOGGER.warning("Error updating menu data, keeping previous menu: %s", exception)
+            return self.data
+
+        if not data:
+            if self.data is None:
+                raise UpdateFailed("No menu data returned from API")
+            _LOGGER.warning("No menu data returned from API, keeping previous menu")
+            return self.data
+
+        return data
 
 
 class LinQConnectSensor(CoordinatorEntity, SensorEntity):
@@ -101,6 +113,8 @@ class LinQConnectSensor(CoordinatorEntity, SensorEntity):
         self._attr_name = "School Menu"
         self._attr_icon = "mdi:food"
         self._picture_data = {}
+        self._cached_attrs: dict[str, Any] = {}
+        self._cached_data: dict[str, Any] | None = None
 
     @property
     def native_value(self) -> str | None:
@@ -129,6 +143,10 @@ class LinQConnectSensor(CoordinatorEntity, SensorEntity):
         if not self.coordinator.data:
             return {}
 
+        # Coordinator data is replaced on each update, so reuse attributes until then
+        if self.coordinator.data is self._cached_data:
+            return self._cached_attrs
+
         attributes = {
             "last_updated": self.coordinator.data.get("last_updated"),
             "days_requested": self.coordinator.data.get("days_requested", 1),
@@ -140,28 +158,12 @@ class LinQConnectSensor(CoordinatorEntity, SensorEntity):
         for i, menu in enumerate(menus):
             day_key = f"day_{i+1}"
 
-            # Create structured day data object for template access
-            categories = menu.get("categories", {})
-            menu_items = []
-            for category_name, items in categories.items():
-                for item in items:
-                    if isinstance(item, dict):
-                        menu_items.append({
-                            "category_name": category_name,
-                            "item_name": item["name"]
-                        })
-                    else:
-                        menu_items.append({
-                            "category_name": category_name,
-                            "item_name": item
-                        })
-
-            # Store complete day data as structured object
+            # Store complete day data as structured object for template access
             day_data = {
                 "date": menu.get("date", f"Day {i+1}"),
                 "date_display": menu.get("date", f"Day {i+1}"),
                 "session": menu.get("session", "Unknown"),
-                "menu_items": menu_items,
+                "menu_items": menu.get("menu_items_flat", []),
                 "item_count": menu.get("item_count", 0),
                 "category_count": menu.get("category_count", 0)
             }
@@ -171,15 +173,7 @@ class LinQConnectSensor(CoordinatorEntity, SensorEntity):
             attributes[f"{day_key}_date"] = menu.get("date", f"Day {i+1}")
             attributes[f"{day_key}_items"] = menu.get("items", [])
 
-            # Convert categories to simple format for backward compatibility
-            simple_categories = {}
-            for category_name, items in categories.items():
-                if items:
-                    simple_categories[category_name] = [
-                        item["name"] if isinstance(item, dict) else item
-                        for item in items
-                    ]
-            attributes[f"{day_key}_categories"] = simple_categories
+            attributes[f"{day_key}_categories"] = menu.get("simple_categories", {})
             attributes[f"{day_key}_item_count"] = menu.get("item_count", 0)
             attributes[f"{day_key}_category_count"] = menu.get("category_count", 0)
 
@@ -196,6 +190,8 @@ class LinQConnectSensor(CoordinatorEntity, SensorEntity):
                 # Also store the count of pictures available
                 attributes[f"{day_key}_picture_count"] = len(all_pictures)
 
+        self._cached_data = self.coordinator.data
+        self._cached_attrs = attributes
         return attributes
 
     @property